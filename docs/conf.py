@@ -49,11 +49,18 @@ html_title = "EyeLinkIO 👀"
 
 # -- Intersphinx configuration -----------------------------------------------
 
+# ``make update-intersphinx`` downloads the inventories of these projects.
+intersphinx_urls = {
+    "python": "https://docs.python.org/3",
+    "numpy": "https://numpy.org/doc/stable",
+    "mne": "https://mne.tools/dev",
+    "pandas": "https://pandas.pydata.org/pandas-docs/stable",
+}
+# Use the inventories cached in _intersphinx/ (see ``make update-intersphinx``),
+# and only fetch them over the network if they have not been downloaded yet.
 intersphinx_mapping = {
-    "python": ("https://docs.python.org/3", None),
-    "numpy": ("https://numpy.org/doc/stable", None),
-    "mne": ("https://mne.tools/dev", None),
-    "pandas": ("https://pandas.pydata.org/pandas-docs/stable", None),
+    name: (url, (f"_intersphinx/{name}.inv", None))
+    for name, url in intersphinx_urls.items()
 }
 
 
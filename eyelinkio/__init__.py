@@ -3,13 +3,35 @@
 #
 # License: BSD (3-clause)
 
-from . import utils
-
-from .edf import read_edf, EDF
+from importlib import import_module
 
 try:
     from importlib.metadata import version
 
     __version__ = version("eyelinkio")
 except Exception:
-    __version__ = "0.0.0"
\ No newline at end of file
+    __version__ = "0.0.0"
+
+# Submodules and attributes are imported on first access (PEP 562), so that
+# importing eyelinkio does not load numpy or the EDF API until they are needed.
+_lazy_attrs = {
+    "edf": ".edf",
+    "utils": ".utils",
+    "read_edf": ".edf",
+    "EDF": ".edf",
+}
+
+__all__ = ["read_edf", "EDF", "utils"]
+
+
+def __getattr__(name):
+    if name not in _lazy_attrs:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = import_module(_lazy_attrs[name], __name__)
+    value = module if module.__name__ == f"{__name__}.{name}" else getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_attrs))
@@ -175,15 +175,17 @@ edf_get_float_data = edfapi.edf_get_float_data
 edf_get_float_data.argtypes = [POINTER(EDFFILE)]
 edf_get_float_data.restype = POINTER(ALLF_DATA)
 
+# not exported by every version of the EDF API
+edf_get_element_count = getattr(edfapi, "edf_get_element_count", None)
+if edf_get_element_count is not None:
+    edf_get_element_count.argtypes = [POINTER(EDFFILE)]
+    edf_get_element_count.restype = c_uint
+
 """
 edf_get_sample_close_to_time = edfapi.edf_get_sample_close_to_time
 edf_get_sample_close_to_time.argtypes = [POINTER(EDFFILE), c_uint]
 edf_get_sample_close_to_time.restype = POINTER(ALLF_DATA)
 
-edf_get_element_count = edfapi.edf_get_element_count
-edf_get_element_count.argtypes = [POINTER(EDFFILE)]
-edf_get_element_count.restype = c_uint
-
 edf_get_revision = edfapi.edf_get_revision
 edf_get_revision.argtypes = [POINTER(EDFFILE)]
 edf_get_revision.restype = c_int
@@ -2,8 +2,8 @@
 
 import ctypes as ct
 import warnings
+from copy import deepcopy
 from datetime import datetime
-from functools import partial
 from os import path as op
 from pathlib import Path
 
@@ -11,7 +11,10 @@ import numpy as np
 
 try:
     from ._edf2py import (
+        FEVENT,
+        FSAMPLE,
         edf_close_file,
+        edf_get_element_count,
         edf_get_float_data,
         edf_get_next_data,
         edf_get_preamble_text,
@@ -31,7 +34,10 @@ except OSError as exp:
         edf_get_preamble_text_length,
         edf_get_version,
         edf_get_float_data,
-    ) = [None] * 8
+        edf_get_element_count,
+        FEVENT,
+        FSAMPLE,
+    ) = [None] * 10
     has_edfapi = False
     why_not = str(exp)
 
@@ -39,22 +45,31 @@ from . import _defines as defines
 from ._defines import event_constants
 
 _MAX_MSG_LEN = 260  # maxmimum message length we'll need to store
+_NON_ASCII = bytes(range(128, 256))  # bytes stripped from messages
+_SAMPLE_BUFFER_LEN = 4096  # number of raw samples to stage before copying them
+_NPY_HEADER_LEN = 128  # bytes before the samples in .npy files we memory-map
 
 
-def read_edf(fname):
+def read_edf(fname, mmap=None):
     """Read an EyeLink EDF file.
 
     Parameters
     ----------
     fname : path-like
         The name of the EDF file.
+    mmap : path-like | None
+        If not ``None``, write the samples to a ``.npy`` file at this path while
+        reading, and return them as a memory-mapped array, so that long recordings
+        do not have to fit in memory. The file holds one row per sample: the EDF
+        sample time, followed by the ``sample_fields``, so the returned samples
+        are a transposed (Fortran-ordered) view of it. Defaults to ``None``.
 
     Returns
     -------
     edf : EDF
         An instance of EDF:  The EyeLink data represented in Python.
     """
-    return EDF(fname)
+    return EDF(fname, mmap=mmap)
 
 
 class EDF(dict):
@@ -67,12 +82,15 @@ class EDF(dict):
     ----------
     fname : str
         The name of the EDF file.
+    mmap : path-like | None
+        If not ``None``, the ``.npy`` file to memory-map the samples to. See
+        :func:`read_edf`.
     """
 
-    def __init__(self, fname):
+    def __init__(self, fname, mmap=None):
         if not has_edfapi:
             raise OSError("Could not load EDF api: %s" % why_not)
-        info, discrete, times, samples = _read_raw_edf(fname)
+        info, discrete, times, samples = _read_raw_edf(fname, mmap=mmap)
         self.info = info
         self.info["filename"] = Path(fname).name
         self.discrete = discrete
@@ -94,6 +112,30 @@ class EDF(dict):
             f"  Length: {len(self['times']) / self['info']['sfreq']} seconds \n"
         )
 
+    def copy(self):
+        """Return a copy of the EDF object.
+
+        The ``info`` dictionary is copied, but the (potentially large) sample,
+        time and event arrays are shared with the original object.
+
+        Returns
+        -------
+        edf : EDF
+            The copy.
+        """
+        new = dict.__new__(type(self))  # don't re-read the file
+        new.__dict__.update(self.__dict__)
+        new.info = deepcopy(self.info)
+        new.discrete = dict(self.discrete)
+        dict.__init__(
+            new,
+            info=new.info,
+            discrete=new.discrete,
+            times=self["times"],
+            samples=self["samples"],
+        )
+        return new
+
     def to_pandas(self):
         """Convert an EDF file to a pandas DataFrame.
 
@@ -143,42 +185,13 @@ class _edf_open:
                 raise OSError('File "%s" could not be closed' % self.fname)
 
 
-_ets2pp = dict(
-    SAMPLE_TYPE="sample",
-    ENDFIX="fixations",
-    ENDSACC="saccades",
-    ENDBLINK="blinks",
-    BUTTONEVENT="buttons",
-    INPUTEVENT="inputs",
-    MESSAGEEVENT="messages",
-)
-
-
-def _read_raw_edf(fname):
+def _read_raw_edf(fname, mmap=None):
     """Read data from raw EDF file into pyeparse format."""
     if not op.isfile(fname):
         raise OSError('File "%s" does not exist' % fname)
 
     #
-    # First pass: get the number of each type of sample
-    #
-    n_samps = dict()
-    offsets = dict()
-    for key in _ets2pp.values():
-        n_samps[key] = 0
-        offsets[key] = 0
-    with _edf_open(fname) as edf:
-        etype = None
-        while etype != event_constants.get("NO_PENDING_ITEMS"):
-            etype = edf_get_next_data(edf)
-            if etype not in event_constants:
-                raise RuntimeError("unknown type %s" % event_constants[etype])
-            ets = event_constants[etype]
-            if ets in _ets2pp:
-                n_samps[_ets2pp[ets]] += 1
-
-    #
-    # Now let's actually read in the data
+    # Read in the data in a single pass, collecting each kind of element in a list
     #
     with _edf_open(fname) as edf:
         info = _parse_preamble(edf)
@@ -186,28 +199,38 @@ def _read_raw_edf(fname):
         res = dict(
             info=info,
             samples=None,
-            n_samps=n_samps,
-            offsets=offsets,
+            mmap=mmap,
             edf_fields=dict(messages=["stime", "msg"]),
+            dtypes=dict(),
             discrete=dict(),
         )
-        # XXX: pyeparse represented messages as byte strings.
-        # XXX: Maybe we should use regular python strings?
-        dtype = [("stime", np.float64), ("msg", "|S%s" % _MAX_MSG_LEN)]
-        res["discrete"]["messages"] = np.empty((n_samps["messages"]), dtype=dtype)
+        res["discrete"]["messages"] = list()
         res["eye_idx"] = None  # in case we get input/button before START
-        while etype != event_constants.get("NO_PENDING_ITEMS"):
-            etype = edf_get_next_data(edf)
-            if etype not in event_constants:
-                raise RuntimeError("unknown type %s" % event_constants[etype])
-            ets = event_constants[etype]
-            _element_handlers[ets](edf, res)
+        # bind what the loop uses to locals, it runs once per sample and event
+        handlers, get_next_data = _etype_handlers, edf_get_next_data
+        n_etypes = len(handlers)
+        no_pending = event_constants["NO_PENDING_ITEMS"]
+        while etype != no_pending:
+            etype = get_next_data(edf)
+            handler = handlers[etype] if 0 <= etype < n_etypes else None
+            if handler is None:
+                raise RuntimeError("unknown type %s" % etype)
+            handler(edf, res)
         _element_handlers["VERSION"](res)
+        _flush_samples(res)
+        if mmap is not None and res["samples"] is not None:
+            # drop the unused rows at the end of the file
+            _resize_samples(res, res["n_samples"])
 
     #
     # Put info and discrete into correct output format
     #
-    discrete = res["discrete"]
+    discrete = {
+        name: _messages_to_array(vals)
+        if name == "messages"
+        else _events_to_array(vals, res["dtypes"][name])
+        for name, vals in res["discrete"].items()
+    }
     info = res["info"]
     event_types = ("saccades", "fixations", "blinks", "buttons", "inputs", "messages")
     info["sample_fields"] = info["sample_fields"][1:]  # omit time
@@ -215,15 +238,23 @@ def _read_raw_edf(fname):
     #
     # fix sample times
     #
-    data = res["samples"][1:]
-    data[data >= 100000000.0 - 1] = np.nan
-    orig_times = res["samples"][0]  # original times
-    assert np.array_equal(orig_times, np.sort(orig_times))
+    samples = res["samples"][:, : res["n_samples"]]
+    data = samples[1:]  # missing values were set to NaN while reading
+    orig_times = samples[0]  # original times
+    assert (orig_times[1:] >= orig_times[:-1]).all()  # sorted; skipped with -O
     times = np.arange(len(orig_times), dtype=np.float64) / info["sfreq"]
-    for key in event_types:
-        for sub_key in ("stime", "etime"):
-            if sub_key in discrete[key].dtype.names:
-                _adjust_time(discrete[key][sub_key], orig_times, times)
+    # gather every event time column so they can all be adjusted in one pass
+    time_cols = [
+        discrete[key][sub_key]
+        for key in event_types
+        for sub_key in ("stime", "etime")
+        if sub_key in discrete[key].dtype.names
+    ]
+    adjusted = _adjust_time(np.concatenate(time_cols), orig_times, info["sfreq"])
+    start = 0
+    for col in time_cols:
+        col[:] = adjusted[start : start + len(col)]
+        start += len(col)
 
     _extract_calibration(info, discrete["messages"])
 
@@ -231,24 +262,45 @@ def _read_raw_edf(fname):
     return info, discrete, times, data
 
 
-def _adjust_time(x, orig_times, times):
-    """Adjust time, inplace."""
-    x[:] = np.interp(x, orig_times, times)
+def _adjust_time(x, orig_times, sfreq):
+    """Convert EyeLink timestamps to seconds relative to the first sample.
+
+    This is equivalent to ``np.interp(x, orig_times, times)``, where ``times`` is
+    the uniform sample grid, but exploits that grid to locate each timestamp with
+    a single :func:`numpy.searchsorted` call.
+    """
+    if len(orig_times) < 2:
+        return np.zeros_like(x)
+    idx = np.searchsorted(orig_times, x, side="right")
+    idx -= 1
+    np.clip(idx, 0, len(orig_times) - 2, out=idx)
+    lo = orig_times[idx]
+    # position between the two neighbouring samples, computed in place; samples
+    # can share a (ms) timestamp, so guard against zero-width intervals
+    out = np.subtract(x, lo)
+    span = np.subtract(orig_times[idx + 1], lo, out=lo)
+    np.divide(out, span, out=out, where=span > 0)
+    np.clip(out, 0.0, 1.0, out=out)
+    out += idx
+    # like np.interp, clamp to the first and last sample outside their range
+    out[x < orig_times[0]] = 0
+    out[x >= orig_times[-1]] = len(orig_times) - 1
+    out /= sfreq
+    return out
 
 
 def _extract_calibration(info, messages):
     """Extract calibration from messages."""
-    lines = []
-    for msg in messages["msg"]:
-        msg = msg.decode("ASCII")
-        if msg.startswith("!CAL") or msg.startswith("VALIDATE"):
-            lines.append(msg)
-        if msg.startswith("GAZE_COORDS"):
-            coords = msg.split()[-4:]
-            coords = [int(round(float(c))) for c in coords]
-            info["screen_coords"] = np.array(
-                [coords[2] - coords[0] + 1, coords[3] - coords[1] + 1], int
-            )
+    # messages are bytes; find the few we need in one pass, and only decode those
+    msgs = messages["msg"]
+    is_cal = np.char.startswith(msgs, b"!CAL") | np.char.startswith(msgs, b"VALIDATE")
+    lines = np.char.decode(msgs[is_cal], "ASCII").tolist()
+    for msg in msgs[np.char.startswith(msgs, b"GAZE_COORDS")]:
+        coords = msg.decode("ASCII").split()[-4:]
+        coords = [int(round(float(c))) for c in coords]
+        info["screen_coords"] = np.array(
+            [coords[2] - coords[0] + 1, coords[3] - coords[1] + 1], int
+        )
     calibrations = list()
     keys = ["point_x", "point_y", "offset", "diff_x", "diff_y"]
     li = 0
@@ -257,22 +309,19 @@ def _extract_calibration(info, messages):
         if "!CAL VALIDATION " in line and "ABORTED" not in line:
             cal_kind = line.split("!CAL VALIDATION ")[1].split()[0]
             n_points = int([c for c in cal_kind if c.isdigit()][0])
-            this_validation = []
-            for ni in range(n_points):
-                subline = lines[li + ni + 1].split()
-                xy = subline[-6].split(",")
-                xy_diff = subline[-2].split(",")
-                vals = [
-                    float(v)
-                    for v in [xy[0], xy[1], subline[-4], xy_diff[0], xy_diff[1]]
-                ]
-                this_validation.append(vals)
+            # last 6 tokens: "x,y OFFSET offset deg. diff_x,diff_y pix."
+            tokens = np.array(
+                [lines[li + ni + 1].split()[-6:] for ni in range(n_points)]
+            ).reshape(n_points, 6)
+            xy = np.char.partition(tokens[:, 0], ",")
+            xy_diff = np.char.partition(tokens[:, 4], ",")
             li += n_points
-            this_validation = np.array(this_validation)
             dtype = [(key, "f8") for key in keys]
-            out = np.empty(len(this_validation), dtype=dtype)
-            for key, data in zip(keys, this_validation.T):
-                out[key] = data
+            out = np.empty(n_points, dtype=dtype)
+            for key, col in zip(
+                keys, (xy[:, 0], xy[:, 2], tokens[:, 2], xy_diff[:, 0], xy_diff[:, 2])
+            ):
+                out[key] = col.astype(np.float64)
             calibrations.append(out)
         li += 1
     info["calibrations"] = np.array(calibrations)
@@ -308,18 +357,37 @@ def _parse_preamble(edf):
     return info
 
 
-def _to_list(element, keys, idx):
-    """Return a list of particular fields of an EyeLink data element."""
-    out = list()
-    for k in keys:
-        v = getattr(element, k)
-        if hasattr(v, "_length_"):
-            out.append(v[idx])
-        else:
-            out.append(v)
+def _messages_to_array(vals):
+    """Convert the collected (stime, msg) pairs to a structured array."""
+    # XXX: pyeparse represented messages as byte strings.
+    # XXX: Maybe we should use regular python strings?
+    # size the msg field to the longest message, rather than to _MAX_MSG_LEN
+    width = max((len(msg) for _, msg in vals), default=1)
+    return np.array(vals, dtype=[("stime", np.float64), ("msg", "|S%s" % width)])
+
+
+def _events_to_array(vals, dtype):
+    """Convert the raw FEVENT structs collected for one event type."""
+    raw = np.frombuffer(vals, dtype=dtype)
+    out = np.empty(len(raw), [(_el2pp[key], np.float64) for key in dtype.names])
+    for key in dtype.names:
+        out[_el2pp[key]] = raw[key]
     return out
 
 
+def _struct_dtype(struct, keys):
+    """Return a numpy dtype that views particular fields of a ctypes structure."""
+    fields = dict(struct._fields_)
+    return np.dtype(
+        dict(
+            names=keys,
+            formats=[np.dtype(fields[k]) for k in keys],
+            offsets=[getattr(struct, k).offset for k in keys],
+            itemsize=ct.sizeof(struct),
+        )
+    )
+
+
 def _sample_fields_available(sflags):
     """Indicate which fields are available in a sample.
 
@@ -432,57 +500,126 @@ def _handle_recording_info(edf, res):
     sample_fld = [_el2pp[field] for field in edf_fields]
     res["edf_sample_fields"] = edf_fields
     res["info"]["sample_fields"] = sample_fld
-    res["samples"] = np.empty((len(edf_fields), res["n_samps"]["sample"]), np.float64)
+    # the element count (samples + events) is an upper bound on the sample count
+    n_elements = _SAMPLE_BUFFER_LEN
+    if edf_get_element_count is not None:
+        n_elements = max(edf_get_element_count(edf), n_elements)
+    res["n_samples"] = 0
+    _resize_samples(res, n_elements)
+    # raw FSAMPLE structs are staged here and copied into samples in batches
+    buf = np.empty(_SAMPLE_BUFFER_LEN, _struct_dtype(FSAMPLE, edf_fields))
+    res["sample_buffer"] = buf
+    res["sample_buffer_addr"] = buf.ctypes.data
+    res["n_buffered"] = 0
+    # views into the buffer that feed each row of samples (per-eye fields are
+    # resolved to the recorded eye here, once per recording)
+    res["sample_columns"] = [
+        buf[field][:, res["eye_idx"]] if buf.dtype[field].shape else buf[field]
+        for field in edf_fields
+    ]
 
 
 def _handle_sample(edf, res):
     """SAMPLE_TYPE."""
-    e = edf_get_float_data(edf).contents.fs
-    off = res["offsets"]["sample"]
-    res["samples"][:, off] = _to_list(e, res["edf_sample_fields"], res["eye_idx"])
-    res["offsets"]["sample"] += 1
+    buf = res["sample_buffer"]
+    n = res["n_buffered"]
+    size = buf.itemsize
+    ct.memmove(
+        res["sample_buffer_addr"] + n * size,
+        ct.addressof(edf_get_float_data(edf).contents.fs),
+        size,
+    )
+    res["n_buffered"] = n + 1
+    if n + 1 == len(buf):
+        _flush_samples(res)
+
+
+def _resize_samples(res, capacity):
+    """Allocate or resize the samples array, keeping the samples read so far."""
+    n_cols = len(res["edf_sample_fields"])
+    off = res["n_samples"]
+    if res["mmap"] is None:
+        samples = np.empty((n_cols, capacity), np.float64)
+        if res["samples"] is not None:
+            samples[:, :off] = res["samples"][:, :off]
+        res["samples"] = samples
+        return
+    # on disk we store one row per sample, so the file is resized at its end
+    shape = (capacity, n_cols)
+    mode = "wb" if res["samples"] is None else "r+b"
+    if res["samples"] is not None:
+        res["samples"].base.flush()
+        res["samples"] = None  # close the mapping before resizing the file
+    with open(res["mmap"], mode) as fid:
+        _write_npy_header(fid, shape)
+        fid.truncate(_NPY_HEADER_LEN + capacity * n_cols * 8)
+    samples = np.memmap(
+        res["mmap"], np.float64, "r+", offset=_NPY_HEADER_LEN, shape=shape
+    )
+    res["samples"] = samples.T
+
+
+def _write_npy_header(fid, shape):
+    """Write a fixed-size .npy header, so the data offset never changes."""
+    header = "{'descr': '<f8', 'fortran_order': False, 'shape': %r, }" % (shape,)
+    prefix = np.lib.format.magic(1, 0)
+    n_header = _NPY_HEADER_LEN - len(prefix) - 2  # 2 bytes for the length
+    if len(header) >= n_header:
+        raise ValueError("Too many samples for the .npy header: %s" % (shape,))
+    fid.seek(0)
+    fid.write(prefix + n_header.to_bytes(2, "little"))
+    fid.write((header.ljust(n_header - 1) + "\n").encode("latin1"))
+
+
+def _flush_samples(res):
+    """Copy the staged raw samples into the samples array."""
+    if res["samples"] is None:  # no recording block was found
+        return
+    n = res["n_buffered"]
+    off = res["n_samples"]
+    capacity = res["samples"].shape[1]
+    if off + n > capacity:  # element count missing or short: grow by doubling
+        _resize_samples(res, 2 * capacity)
+    for ii, (field, col) in enumerate(
+        zip(res["edf_sample_fields"], res["sample_columns"])
+    ):
+        out = res["samples"][ii, off : off + n]
+        out[:] = col[:n]
+        if field != "time":  # while the batch is in cache, mark missing data
+            out[out >= 100000000.0 - 1] = np.nan
+    res["n_samples"] += n
+    res["n_buffered"] = 0
 
 
 def _handle_message(edf, res):
     """MESSAGEEVENT."""
     e = edf_get_float_data(edf).contents.fe
-    msg = ct.string_at(ct.byref(e.message[0]), e.message.contents.len + 1)[2:]
-    msg = msg.decode("UTF-8")
-    msg = "".join([i if ord(i) < 128 else "" for i in msg])
+    lstr = e.message.contents
+    # the text follows the 2-byte length field of the LSTRING
+    msg = ct.string_at(ct.addressof(lstr) + 2, max(lstr.len - 1, 0))
+    msg = msg.translate(None, _NON_ASCII)
     if len(msg) > _MAX_MSG_LEN:
-        warnings.warn("Message truncated to %s characters:\n%s" % (_MAX_MSG_LEN, msg))
-    off = res["offsets"]["messages"]
-    res["discrete"]["messages"]["stime"][off] = e.sttime
-    res["discrete"]["messages"]["msg"][off] = msg[:_MAX_MSG_LEN]
-    res["offsets"]["messages"] += 1
-
-
-def _handle_end(edf, res, name):
-    """ENDSACC, ENDFIX, ENDBLINK, BUTTONS, INPUT."""
-    if name not in res["discrete"]:
-        # XXX This should be changed to support given fields
-        if name == "saccades":
-            f = ["eye", "sttime", "entime", "gstx", "gsty", "genx", "geny", "pvel"]
-        elif name == "fixations":
-            f = ["eye", "sttime", "entime", "gavx", "gavy"]
-        elif name == "blinks":
-            f = ["eye", "sttime", "entime"]
-        elif name == "buttons":
-            f = ["sttime", "buttons"]
-        elif name == "inputs":
-            f = ["sttime", "input"]
-        else:
-            raise KeyError("Unknown name %s" % name)
-        res["edf_fields"][name] = f
-        our_names = [_el2pp[field] for field in f]
-        dtype = [(ff, np.float64) for ff in our_names]
-        res["discrete"][name] = np.empty(res["n_samps"][name], dtype=dtype)
-    e = edf_get_float_data(edf).contents.fe
-    vals = _to_list(e, res["edf_fields"][name], res["eye_idx"])
-    off = res["offsets"][name]
-    for ff, vv in zip(res["discrete"][name].dtype.names, vals):
-        res["discrete"][name][ff][off] = vv
-    res["offsets"][name] += 1
+        warnings.warn(
+            "Message truncated to %s characters:\n%s"
+            % (_MAX_MSG_LEN, msg.decode("ASCII"))
+        )
+    res["discrete"]["messages"].append((e.sttime, msg[:_MAX_MSG_LEN]))
+
+
+def _make_end_handler(name):
+    """Make the ENDSACC, ENDFIX, ENDBLINK, BUTTONS or INPUT handler for name."""
+    fields = _event_fields[name]  # resolved once, not per event
+
+    def _handle_end(edf, res):
+        if name not in res["discrete"]:
+            res["edf_fields"][name] = list(fields)
+            res["dtypes"][name] = _struct_dtype(FEVENT, fields)
+            res["discrete"][name] = bytearray()  # raw FEVENT structs
+        e = edf_get_float_data(edf).contents.fe
+        res["discrete"][name] += ct.string_at(ct.addressof(e), ct.sizeof(e))
+
+    return _handle_end
+
 
 def _handle_pass(edf, res):
     """Events we don't care about or haven't had to care about yet."""
@@ -500,6 +637,16 @@ def _handle_version(res):
     res["info"]["edfapi_version"] = version.decode("utf-8")
 
 
+# FEVENT fields collected for each kind of event
+# XXX This should be changed to support given fields
+_event_fields = dict(
+    saccades=("eye", "sttime", "entime", "gstx", "gsty", "genx", "geny", "pvel"),
+    fixations=("eye", "sttime", "entime", "gavx", "gavy"),
+    blinks=("eye", "sttime", "entime"),
+    buttons=("sttime", "buttons"),
+    inputs=("sttime", "input"),
+)
+
 # element_handlers maps the various EDF file element types to the
 # element handler function that should be called.
 
@@ -507,11 +654,11 @@ _element_handlers = dict(
     RECORDING_INFO=_handle_recording_info,
     SAMPLE_TYPE=_handle_sample,
     MESSAGEEVENT=_handle_message,
-    ENDFIX=partial(_handle_end, name="fixations"),
-    ENDSACC=partial(_handle_end, name="saccades"),
-    ENDBLINK=partial(_handle_end, name="blinks"),
-    BUTTONEVENT=partial(_handle_end, name="buttons"),
-    INPUTEVENT=partial(_handle_end, name="inputs"),
+    ENDFIX=_make_end_handler("fixations"),
+    ENDSACC=_make_end_handler("saccades"),
+    ENDBLINK=_make_end_handler("blinks"),
+    BUTTONEVENT=_make_end_handler("buttons"),
+    INPUTEVENT=_make_end_handler("inputs"),
     STARTFIX=_handle_pass,
     STARTSACC=_handle_pass,
     STARTBLINK=_handle_pass,
@@ -526,3 +673,10 @@ _element_handlers = dict(
     ENDEVENTS=_handle_pass,
     VERSION=_handle_version,
 )
+
+# _etype_handlers maps the integer element type codes returned by
+# edf_get_next_data directly to their handler, avoiding dict lookups per element.
+_etype_handlers = [None] * (max(k for k in event_constants if isinstance(k, int)) + 1)
+for _etype, _ets in event_constants.items():
+    if isinstance(_etype, int) and _ets in _element_handlers:
+        _etype_handlers[_etype] = _element_handlers[_ets]
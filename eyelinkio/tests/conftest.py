@@ -0,0 +1,10 @@
+import pytest
+
+from eyelinkio import read_edf
+from eyelinkio.utils import _get_test_fnames
+
+
+@pytest.fixture(scope="session")
+def edf_files():
+    """Read each test EDF file once per test session."""
+    return {fname: read_edf(fname) for fname in _get_test_fnames()}
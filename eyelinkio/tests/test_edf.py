@@ -1,46 +1,96 @@
+from importlib import import_module
+
 import numpy as np
 import pytest
 
 from eyelinkio import read_edf
+from eyelinkio.edf.read_edf import _adjust_time
 from eyelinkio.utils import _get_test_fnames, requires_edfapi
 
 fnames = _get_test_fnames()
 
 @requires_edfapi
-def test_read_raw():
+@pytest.mark.parametrize("fname", fnames, ids=[fname.name for fname in fnames])
+def test_read_raw(fname, edf_files):
     """Test reading raw data."""
-    for fname in fnames:
-        edf_file = read_edf(fname)
-        # test repr
-        assert repr(edf_file)
+    edf_file = edf_files[fname]
+    # test repr
+    assert repr(edf_file)
+
+    # tests dtypes are parsed correctly that is double only
+    assert edf_file['samples'].dtype == np.float64
+
+    if fname.name == "test_2_raw.edf":  # First test file has this property
+        for kind in ['saccades', 'fixations', 'blinks']:
+            assert edf_file["discrete"][kind][0]['stime'] < 12.0
+    assert edf_file['times'][0] < 1.0
+    assert edf_file["info"]["eye"] == "LEFT_EYE"
+    assert edf_file["info"]["ps_units"] == "PUPIL_AREA"
+
+@pytest.mark.parametrize("duplicate", [False, True])
+def test_adjust_time(duplicate):
+    """Test that retiming events matches np.interp onto the sample grid."""
+    sfreq = 2000.0 if duplicate else 1000.0
+    orig_times = np.arange(1000.0, 1010.0)
+    if duplicate:  # integer ms timestamps repeat at sampling rates above 1 kHz
+        orig_times = np.repeat(orig_times, 2)
+    orig_times[len(orig_times) // 2 :] += 50  # a gap in the recording
+    times = np.arange(len(orig_times)) / sfreq
+    x = np.concatenate(
+        [orig_times, orig_times + 0.5, [990.0, 999.5, 1030.0, 1100.0, 2000.0]]
+    )
+    with np.errstate(all="raise"):
+        got = _adjust_time(x.copy(), orig_times, sfreq)
+    np.testing.assert_allclose(got, np.interp(x, orig_times, times), atol=1e-12)
 
-        # tests dtypes are parsed correctly that is double only
-        assert edf_file['samples'].dtype == np.float64
+@requires_edfapi
+def test_copy(edf_files):
+    """Test that copies share samples but not info."""
+    edf_file = edf_files[fnames[0]]
+    edf_copy = edf_file.copy()
+    assert type(edf_copy) is type(edf_file)
+    assert edf_copy["samples"] is edf_file["samples"]
+    assert edf_copy["info"] is edf_copy.info
+    edf_copy["info"]["filename"] = "foo.edf"
+    assert edf_file["info"]["filename"] != "foo.edf"
 
-        if fname.name == "test_2_raw.edf":  # First test file has this property
-            for kind in ['saccades', 'fixations', 'blinks']:
-                assert edf_file["discrete"][kind][0]['stime'] < 12.0
-        assert edf_file['times'][0] < 1.0
-        assert edf_file["info"]["eye"] == "LEFT_EYE"
-        assert edf_file["info"]["ps_units"] == "PUPIL_AREA"
+@requires_edfapi
+@pytest.mark.parametrize("grow", [False, True])
+def test_read_mmap(tmp_path, edf_files, monkeypatch, grow):
+    """Test memory-mapping the samples to a file while reading."""
+    # the read_edf function shadows its module as an attribute of eyelinkio.edf
+    read_edf_module = import_module("eyelinkio.edf.read_edf")
+    if grow:  # undersize the samples array, so the file has to grow while reading
+        monkeypatch.setattr(read_edf_module, "edf_get_element_count", lambda edf: 0)
+        monkeypatch.setattr(read_edf_module, "_SAMPLE_BUFFER_LEN", 16)
+    fname = fnames[0]
+    edf_file = read_edf(fname, mmap=tmp_path / "samples.npy")
+    want = edf_files[fname]
+    assert isinstance(edf_file["samples"], np.memmap)
+    np.testing.assert_array_equal(edf_file["samples"], want["samples"])
+    np.testing.assert_array_equal(edf_file["times"], want["times"])
+    # one row per sample: time, then the sample fields
+    on_disk = np.load(tmp_path / "samples.npy")
+    assert on_disk.shape == (len(want["times"]), len(want["info"]["sample_fields"]) + 1)
+    np.testing.assert_array_equal(on_disk[:, 1:].T, want["samples"])
 
 pytest.importorskip('pandas')
-def test_to_pandas():
+@requires_edfapi
+def test_to_pandas(edf_files):
     """Test converting EDF to pandas DataFrame."""
-    fname = _get_test_fnames()[1] # test_raw.edf
-    edf_file = read_edf(fname)
+    edf_file = edf_files[fnames[1]] # test_raw.edf
     dfs = edf_file.to_pandas()
     assert isinstance(dfs, dict)
     np.testing.assert_equal(dfs["discrete"]["blinks"]["eye"].unique(), "LEFT_EYE")
     assert dfs["discrete"]["messages"]["msg"][0] == "RECCFG CR 1000 2 1 L"
 
 pytest.importorskip('mne')
-def test_to_mne():
+@requires_edfapi
+def test_to_mne(edf_files):
     """Test converting EDF to MNE."""
     import mne
 
-    fname = _get_test_fnames()[1] # test_raw.edf
-    edf_file = read_edf(fname)
+    edf_file = edf_files[fnames[1]] # test_raw.edf
     raw, cals = edf_file.to_mne()
     assert isinstance(raw, mne.io.RawArray)
     assert raw.info["sfreq"] == edf_file["info"]["sfreq"]
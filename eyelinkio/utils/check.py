@@ -1,9 +1,10 @@
 from importlib import import_module
 
+from ..edf.read_edf import has_edfapi
+
 
 def _has_edfapi():
     """Determine if a user has edfapi installed."""
-    from ..edf.read_edf import has_edfapi
     return has_edfapi
 
 
@@ -15,9 +16,11 @@ def _check_edfapi():
 
 def requires_edfapi(func):
     """Skip testing if edfapi is not installed."""
+    if _has_edfapi():  # nothing to skip, so don't import pytest
+        return func
     import pytest
 
-    return pytest.mark.skipif(not _has_edfapi(), reason='Requires edfapi')(func)
+    return pytest.mark.skip(reason='Requires edfapi')(func)
 
 
 def _check_pandas_installed(strict=True):
@@ -29,6 +32,18 @@ def _check_mne_installed(strict=True):
     return _soft_import("mne", "exporting to MNE", strict=strict)
 
 
+# so that error msg lines are aligned
+_INDENT = " " * 14
+_SOFT_IMPORT_ERROR = (
+    "For {purpose} to work, the {name} module is needed, "
+    "but it could not be imported.\n"
+    f"{_INDENT}use the following installation method appropriate for your "
+    "environment:\n"
+    f"{_INDENT}'pip install {{name}}'\n"
+    f"{_INDENT}'conda install -c conda-forge {{name}}'"
+)
+
+
 def _soft_import(name, purpose, strict=True):
     """Import soft dependencies, providing informative errors on failure.
 
@@ -42,29 +57,11 @@ def _soft_import(name, purpose, strict=True):
     strict : bool
         Whether to raise an error if module import fails.
     """
-
-    # so that error msg lines are aligned
-    def indent(x):
-        return x.rjust(len(x) + 14)
-
     try:
         mod = import_module(name)
         return mod
     except (ImportError, ModuleNotFoundError):
         if strict:
-            raise RuntimeError(
-                f"For {purpose} to work, the {name} module is needed, "
-                + "but it could not be imported.\n"
-                + "\n".join(
-                    (
-                        indent(
-                            "use the following installation method "
-                            "appropriate for your environment:"
-                        ),
-                        indent(f"'pip install {name}'"),
-                        indent(f"'conda install -c conda-forge {name}'"),
-                    )
-                )
-            )
+            raise RuntimeError(_SOFT_IMPORT_ERROR.format(name=name, purpose=purpose))
         else:
             return False
@@ -1,4 +1,6 @@
+import os
 from datetime import timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
 from warnings import warn
 
@@ -7,11 +9,32 @@ import numpy as np
 from ..edf import _defines
 from .check import _check_mne_installed, _check_pandas_installed
 
+# eye name for each integer eye code, so codes can be converted with one gather
+_EYE_NAMES = np.array(
+    [
+        _defines.eye_constants.get(code, "")
+        for code in range(
+            max(k for k in _defines.eye_constants if isinstance(k, int)) + 1
+        )
+    ],
+    dtype=object,
+)
+
+# channel type, unit and (for gaze) axis of each sample field, for MNE
+_CH_INFO = dict(
+    xpos=("eyegaze", "px", "x"),
+    ypos=("eyegaze", "px", "y"),
+    ps=("pupil", "au"),
+)
 
+
+@lru_cache(maxsize=1)
 def _get_test_fnames():
     """Get usable test files (omit EDF if no edf2asc)."""
     path = Path(__file__).parent.parent / "tests" / "data"
-    fnames = sorted(list(path.glob("*.edf")))  # test_2.edf will be first
+    with os.scandir(path) as entries:
+        fnames = [Path(e.path) for e in entries if e.name.endswith(".edf")]
+    fnames = tuple(sorted(fnames))  # test_2.edf will be first
     assert fnames[0].exists()
     return fnames
 
@@ -36,27 +59,37 @@ def to_pandas(edf_obj):
     dfs["discrete"] = {}
 
     # Discrete
-    for key in edf_obj["discrete"]:
-        cols = edf_obj["discrete"][key].dtype.names
-        dfs["discrete"][key] = pd.DataFrame(edf_obj["discrete"][key], columns=cols)
+    for key, data in edf_obj["discrete"].items():
+        # build from per-field views, so pandas does not re-inspect the record array
+        columns = {name: data[name] for name in data.dtype.names}
         # XXX: pyeparse represented messages as byte strings. Should we change that?
         if key == "messages":
-            dfs["discrete"][key]["msg"] = dfs["discrete"][key]["msg"].astype(str)
+            columns["msg"] = np.char.decode(data["msg"], "utf-8")
         elif key in ["blinks", "saccades", "fixations"]:
-            dfs["discrete"][key]["eye"] = (dfs["discrete"][key]["eye"]).map(
-                _defines.eye_constants
-            )
+            columns["eye"] = _eye_names(data["eye"])
+        dfs["discrete"][key] = pd.DataFrame(columns)
     # Samples
     cols = edf_obj["info"]["sample_fields"]
-    dfs["samples"] = pd.DataFrame(edf_obj["samples"].T, columns=cols)
+    # each row of samples is already a contiguous column, so avoid the transpose
+    dfs["samples"] = pd.DataFrame(
+        {col: edf_obj["samples"][ii] for ii, col in enumerate(cols)}, copy=False
+    )
     # Calibration
+    cals = edf_obj["info"]["calibrations"].squeeze()
     dfs["calibrations"] = pd.DataFrame(
-        edf_obj["info"]["calibrations"].squeeze(),
-        columns=edf_obj["info"]["calibrations"].dtype.names,
+        {name: cals[name] for name in cals.dtype.names or ()}
     )
     return dfs
 
 
+def _eye_names(eye):
+    """Convert an array of integer eye codes to eye names."""
+    codes = eye.astype(np.intp)
+    if codes.size and (codes.min() < 0 or codes.max() >= len(_EYE_NAMES)):
+        return np.array([_defines.eye_constants.get(c, np.nan) for c in eye], object)
+    return _EYE_NAMES[codes]
+
+
 def to_mne(edf_obj):
     """Create and Return an instance of MNE RawEyelink.
 
@@ -76,24 +109,19 @@ def to_mne(edf_obj):
 
     # in mne we need to specify the eye in the ch name, or pick functions will fail
     eye = edf_obj["info"]["eye"].split("_")[0].lower()
-    ch_names = edf_obj["info"]["sample_fields"]
-    ch_names = [f"{ch}_{eye}" for ch in ch_names]
-    ch_types = []
-    more_info = {}
+    sample_fields = edf_obj["info"]["sample_fields"]
+    ch_names = [f"{ch}_{eye}" for ch in sample_fields]
     # Set channel types
-    for ch in ch_names:
-        if ch.startswith(("xpos", "ypos")):
-            ch_types.append("eyegaze")
-            if ch.startswith("x"):
-                more_info[f"{ch}"] = ("eyegaze", "px", f"{eye}", "x")
-            elif ch.startswith("y"):
-                more_info[f"{ch}"] = ("eyegaze", "px", f"{eye}", "y")
-        elif ch.startswith("ps"):
-            ch_types.append("pupil")
-            more_info[f"{ch}"] = ("pupil", "au", f"{eye}")
-        else:
+    for field, ch in zip(sample_fields, ch_names):
+        if field not in _CH_INFO:
             warn(f"Unknown channel type: {ch}. Setting to misc.")
-            ch_types.append("misc")
+    ch_types = [_CH_INFO.get(field, ("misc",))[0] for field in sample_fields]
+    # (ch_type, unit, eye[, axis]) for set_channel_types_eyetrack
+    more_info = {
+        ch: (*_CH_INFO[field][:2], eye, *_CH_INFO[field][2:])
+        for field, ch in zip(sample_fields, ch_names)
+        if field in _CH_INFO
+    }
 
     # Create the info structure
     info = mne.create_info(
@@ -110,62 +138,73 @@ def to_mne(edf_obj):
     # This will set the loc array etc.
     mne.preprocessing.eyetracking.set_channel_types_eyetrack(raw, more_info)
     # Add annotations
-    raw = _add_annotations(edf_obj, raw)
+    raw = _add_annotations(edf_obj, raw, mne)
     # Add calibration
-    calibrations = _create_calibration(edf_obj)
+    calibrations = _create_calibration(edf_obj, mne)
     return raw, calibrations
 
 
-def _add_annotations(edf, raw):
+def _add_annotations(edf, raw, mne):
     """Add MNE Annotations of EyeLink Events to raw."""
     EYE_EVENTS = [
         ("blinks", "BAD_blink"),
         ("saccades", "saccade"),
         ("fixations", "fixation"),
     ]
+    onsets, durations, descriptions, ch_names = [], [], [], []
     # blinks, saccades, fixations
     for ev, desc in EYE_EVENTS:
         onset = edf["discrete"][ev]["stime"]
-        duration = edf["discrete"][ev]["etime"] - onset
-        ch_names = [raw.info["ch_names"]] * len(onset)
-        raw.annotations.append(onset, duration, desc, ch_names)
+        onsets.append(onset)
+        durations.append(edf["discrete"][ev]["etime"] - onset)
+        descriptions.append(np.full(len(onset), desc))
+        ch_names += [raw.info["ch_names"]] * len(onset)
     # messages
     onset = edf["discrete"]["messages"]["stime"]
-    duration = np.zeros_like(onset)
-    desc = edf["discrete"]["messages"]["msg"].astype(str).squeeze()
-    raw.annotations.append(onset, duration, desc)
+    onsets.append(onset)
+    durations.append(np.zeros_like(onset))
+    descriptions.append(np.char.decode(edf["discrete"]["messages"]["msg"], "utf-8"))
+    ch_names += [()] * len(onset)
+    # build all annotations at once, rather than appending once per event kind
+    annotations = mne.Annotations(
+        onset=np.concatenate(onsets),
+        duration=np.concatenate(durations),
+        description=np.concatenate(descriptions),
+        ch_names=ch_names,
+        orig_time=raw.annotations.orig_time,
+    )
+    raw.set_annotations(annotations)
     # TODO: buttons and inputs ?
     return raw
 
 
-def _create_calibration(edf):
+def _create_calibration(edf, mne):
     """Create a calibration event."""
-    from mne.preprocessing.eyetracking import Calibration
-
+    Calibration = mne.preprocessing.eyetracking.Calibration
+
+    cals = edf["info"]["calibrations"]
+    if not len(cals):
+        return []
+    eye = edf["info"]["eye"].split("_")[0].lower()
+    screen_resolution = edf["info"]["screen_coords"]
+    # compute all calibrations at once, shape (n_calibrations, n_points, ...)
+    positions = np.stack((cals["point_x"], cals["point_y"]), axis=-1)
+    gaze = positions + np.stack((cals["diff_x"], cals["diff_y"]), axis=-1)
+    avg_errors = cals["offset"].mean(axis=-1)
+    max_errors = cals["offset"].max(axis=-1)
     calibrations = []
-    for ii, this_cal in enumerate(edf["info"]["calibrations"]):
-        eye = edf["info"]["eye"].split("_")[0].lower()
-        x = this_cal["point_x"]
-        y = this_cal["point_y"]
-        positions = np.array([x, y]).T
-        gx = x + this_cal["diff_x"]
-        gy = y + this_cal["diff_y"]
-        gaze = np.array([gx, gy]).T
-        offsets = this_cal["offset"]
-        avg_error = np.mean(this_cal["offset"])
-        max_error = np.max(this_cal["offset"])
-        screen_resolution = edf["info"]["screen_coords"]
+    for ii in range(len(cals)):
         # XXX: getting onset and model will be tricky.
         # XXX: for binocular data, we will need to get the eye another way
         cal = Calibration(
             onset=None,
             model=None,
             eye=eye,
-            avg_error=avg_error,
-            max_error=max_error,
-            positions=positions,
-            offsets=offsets,
-            gaze=gaze,
+            avg_error=avg_errors[ii],
+            max_error=max_errors[ii],
+            positions=positions[ii],
+            offsets=cals["offset"][ii],
+            gaze=gaze[ii],
             screen_resolution=screen_resolution,
         )
         calibrations.append(cal)